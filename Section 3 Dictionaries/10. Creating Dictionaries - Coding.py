@@ -54,6 +54,61 @@ for f, args in funcs.items():
     result = f(*args)
     print(result)
 
+print('#' * 52 + ' Since the calls are independent of each other, we do not have to run them one after the other.'
+                 ' We can fan them out to a thread pool (for I/O bound functions) or a process pool (for CPU bound'
+                 ' functions), and collect the results - and how long each call took - in dictionaries keyed by'
+                 ' the same functions: ')
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from time import perf_counter, sleep
+
+executors = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+
+
+def timed_call(f, args):
+    start = perf_counter()
+    result = f(*args)
+    return result, perf_counter() - start
+
+
+def dispatch(funcs, executor='thread', max_workers=None):
+    if executor not in executors:
+        raise ValueError(f'executor must be one of {list(executors)}, not {executor!r}')
+    with executors[executor](max_workers=max_workers) as pool:
+        futures = {f: pool.submit(timed_call, f, args) for f, args in funcs.items()}
+    results, timings = {}, {}
+    for f, future in futures.items():
+        results[f], timings[f] = future.result()
+    return results, timings
+
+
+results, timings = dispatch(funcs)
+for f in funcs:
+    print(f.__name__, results[f], f'{timings[f]:.6f}s')
+
+
+def fn_slow_add(a, b):
+    sleep(0.5)
+    return a + b
+
+
+def fn_slow_mult(a, b):
+    sleep(0.5)
+    return a * b
+
+
+slow_funcs = {fn_slow_add: (10, 20), fn_slow_mult: (2, 8)}
+start = perf_counter()
+for f, args in slow_funcs.items():
+    f(*args)
+print(f'serial: {perf_counter() - start:.2f}s')
+
+if __name__ == '__main__':
+    for executor in executors:
+        start = perf_counter()
+        results, timings = dispatch(slow_funcs, executor)
+        print(f'{executor}: {perf_counter() - start:.2f}s', {f.__name__: r for f, r in results.items()})
+
 print('#' * 52 + ' #### Using the class constructor ')
 
 d = dict(a=100, b=200)
@@ -137,6 +192,109 @@ print('#' * 52 + ' We can now easily tweak this to make a dictionary, where the
 grid_extended = {(x, y): math.hypot(x, y) for x, y in grid}
 print(grid_extended)
 
+print('#' * 52 + ' For large grids this dictionary gets expensive: one Python level `hypot` call and one tuple key'
+                 ' per point. If the coordinates are evenly spaced (a `range`), we can store all the distances in a'
+                 ' single NumPy array, computed with one vectorized `np.hypot`, and still look up `grid[(x, y)]`'
+                 ' - `range.index` turns a coordinate into an array index with simple arithmetic: ')
+
+import numbers
+from collections.abc import Mapping
+from itertools import product
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def grid_coordinate(value):
+    # `in` and `index` on a range only use arithmetic for ints - anything else is compared with every
+    # single element - so integral numbers are converted to int first, and everything else is rejected
+    if type(value) is int:
+        return value
+    if not isinstance(value, numbers.Real) or math.floor(value) != value:
+        raise ValueError(f'{value!r} is not a grid coordinate')
+    return math.floor(value)
+
+
+class DistanceGrid(Mapping):
+    def __init__(self, x_coords, y_coords):
+        self.x_coords = x_coords
+        self.y_coords = y_coords
+        xs = np.arange(x_coords.start, x_coords.stop, x_coords.step)
+        ys = np.arange(y_coords.start, y_coords.stop, y_coords.step)
+        self.distances = np.hypot(xs[:, np.newaxis], ys[np.newaxis, :])
+
+    def __getitem__(self, key):
+        try:
+            x, y = key
+            i, j = self.x_coords.index(grid_coordinate(x)), self.y_coords.index(grid_coordinate(y))
+        except (TypeError, ValueError, OverflowError):
+            raise KeyError(key) from None
+        return float(self.distances[i, j])
+
+    def __iter__(self):
+        return product(self.x_coords, self.y_coords)
+
+    def __len__(self):
+        return len(self.x_coords) * len(self.y_coords)
+
+
+if np is not None:
+    distance_grid = DistanceGrid(range(-2, 3), range(-2, 3))
+    print(distance_grid[(1, 1)], (3, 3) in distance_grid, distance_grid[(1.0, 1)], (1.5, 1) in distance_grid)
+    print(dict(distance_grid) == grid_extended)
+
+    from timeit import timeit
+
+    coords = range(-512, 512)
+    print(timeit('{(x, y): math.hypot(x, y) for x in coords for y in coords}', globals=globals(), number=1))
+    print(timeit('DistanceGrid(coords, coords)', globals=globals(), number=1))
+
+print('#' * 52 + ' If we only ever look at a small part of a very large grid, computing everything up front is'
+                 ' wasteful in the first place. Instead we can compute a distance the first time it is looked up,'
+                 ' and keep the most recently used ones in a bounded `lru_cache`: ')
+
+from functools import lru_cache
+from timeit import timeit
+
+
+class LazyDistanceGrid(Mapping):
+    def __init__(self, x_coords, y_coords, maxsize=10_000):
+        self.x_coords = x_coords
+        self.y_coords = y_coords
+        self._distance = lru_cache(maxsize=maxsize)(math.hypot)
+
+    def __getitem__(self, key):
+        try:
+            x, y = key
+            x, y = grid_coordinate(x), grid_coordinate(y)
+        except (TypeError, ValueError, OverflowError):
+            raise KeyError(key) from None
+        if x not in self.x_coords or y not in self.y_coords:
+            raise KeyError(key)
+        return self._distance(x, y)
+
+    def __iter__(self):
+        return product(self.x_coords, self.y_coords)
+
+    def __len__(self):
+        return len(self.x_coords) * len(self.y_coords)
+
+    def cache_info(self):
+        return self._distance.cache_info()
+
+
+lazy_grid = LazyDistanceGrid(range(-2, 3), range(-2, 3))
+print(lazy_grid[(1, 1)], lazy_grid[(1, 1)], (3, 3) in lazy_grid)
+print(lazy_grid.cache_info())
+print(dict(lazy_grid) == grid_extended)
+
+huge_grid = LazyDistanceGrid(range(-1_000_000, 1_000_000), range(-1_000_000, 1_000_000), maxsize=1_000)
+print(len(huge_grid), huge_grid[(300_000, 400_000)], huge_grid.cache_info())
+print((1.5, 2) in huge_grid, huge_grid[(300_000.0, 400_000)])
+print(timeit('(1.5, 2) in huge_grid', globals=globals(), number=1_000))
+
 print('#' * 52 + '  #### Using `fromkeys` ')
 print('#' * 52 + ' The `dict` class also provides the `fromkeys` method that we can use to create dictionaries.'
                  ' This class method is used to create a dictionary from an iterable containing the keys, and'
@@ -45,6 +45,144 @@ for c in text:
         counts[key] = counts.get(key, 0) + 1
 print(counts)
 
+print('#' * 52 + ' Both loops run Python code for every single character, which gets slow for large amounts of'
+                 ' text. Instead we can let C code do the counting: for ASCII text `numpy.bincount` counts all the'
+                 ' byte values in one go, and otherwise `str.count` scans the text once per distinct character'
+                 ' (or `Counter` does it in a single pass when there are many distinct characters): ')
+
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def count_chars(text, fold_case=False, strip_whitespace=False):
+    if np is not None and text.isascii():
+        frequencies = np.bincount(np.frombuffer(text.encode('ascii'), dtype=np.uint8), minlength=128)
+        counts = {chr(code): int(frequencies[code]) for code in np.flatnonzero(frequencies)}
+    else:
+        chars = set(text)
+        if len(chars) <= 256:
+            counts = {c: text.count(c) for c in chars}
+        else:
+            counts = Counter(text)
+    if strip_whitespace:
+        counts = {c: n for c, n in counts.items() if not c.isspace()}
+    if fold_case:
+        # lower each distinct character on its own, just like c.lower() in the loop - text.lower() would
+        # turn a final 'Σ' into 'ς', depending on the characters around it
+        folded = {}
+        for c, n in counts.items():
+            key = c.lower()
+            folded[key] = folded.get(key, 0) + n
+        counts = folded
+    return dict(counts)
+
+
+print(count_chars(text) == {c: text.count(c) for c in text})
+print(count_chars(text, fold_case=True, strip_whitespace=True) == counts)
+
+from timeit import timeit
+
+
+def count_chars_loop(text):
+    counts = dict()
+    for c in text:
+        key = c.lower().strip()
+        if key:
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+print(count_chars('ΟΔΟΣ ΟΔΟΣ İstanbul', fold_case=True, strip_whitespace=True)
+      == count_chars_loop('ΟΔΟΣ ΟΔΟΣ İstanbul'))
+
+# the timings only run when this file is executed, not when the worker processes below import it
+if __name__ == '__main__':
+    big_text = text * 10_000
+    print(timeit('count_chars_loop(big_text)', globals=globals(), number=1))
+    print(timeit('count_chars(big_text, fold_case=True, strip_whitespace=True)', globals=globals(), number=1))
+
+print('#' * 52 + ' For files too large to load into memory we can `mmap` the file and count fixed-size chunks in'
+                 ' a process pool, then add up the per-chunk counts. The only subtlety is that a chunk boundary'
+                 ' must not split a multi-byte UTF-8 character - UTF-8 continuation bytes look like `0b10xxxxxx`,'
+                 ' so we just move each boundary forward past them: ')
+
+import mmap
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+
+def chunk_boundaries(mm, chunk_size):
+    starts = [0]
+    pos = chunk_size
+    while pos < len(mm):
+        while pos < len(mm) and mm[pos] & 0xC0 == 0x80:
+            pos += 1
+        if pos < len(mm):
+            starts.append(pos)
+        pos += chunk_size
+    return list(zip(starts, starts[1:] + [len(mm)]))
+
+
+def count_chars_in_chunk(path, start, end, fold_case=False, strip_whitespace=False):
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return count_chars(mm[start:end].decode('utf-8'), fold_case, strip_whitespace)
+
+
+def count_chars_in_file(path, chunk_size=64 * 2 ** 20, max_workers=None, fold_case=False,
+                        strip_whitespace=False):
+    if not os.path.getsize(path):
+        return {}
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        boundaries = chunk_boundaries(mm, chunk_size)
+    totals = Counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(count_chars_in_chunk, path, start, end, fold_case, strip_whitespace)
+                   for start, end in boundaries]
+        for future in futures:
+            totals.update(future.result())
+    return dict(totals)
+
+
+if __name__ == '__main__':
+    unicode_text = (text + ' Café, naïve, 10€, 😀. ') * 100
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'text.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(unicode_text)
+        print(count_chars_in_file(path, chunk_size=1_001) == count_chars(unicode_text))
+        print(count_chars_in_file(path, chunk_size=997, fold_case=True, strip_whitespace=True)
+              == count_chars(unicode_text, fold_case=True, strip_whitespace=True))
+
+    print('#' * 52 + ' Lets see how this scales with the number of cores on a larger file. Every call starts its own'
+                     ' pool, so the times include starting the workers - and with `spawn` (the default on Windows'
+                     ' and macOS) each worker first imports this script, which is why the timings above are'
+                     ' guarded by `if __name__ == \'__main__\'`: ')
+
+    from time import perf_counter
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'big_text.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            for _ in range(500):
+                f.write(unicode_text)
+        print(f'{os.path.getsize(path) / 2 ** 20:.1f} MiB')
+
+        start = perf_counter()
+        with open(path, encoding='utf-8') as f:
+            expected = count_chars(f.read())
+        print(f'in memory, single process: {perf_counter() - start:.3f}s')
+
+        cores = os.cpu_count()
+        for workers in sorted({cores} | {2 ** i for i in range(8) if 2 ** i < cores}):
+            start = perf_counter()
+            result = count_chars_in_file(path, chunk_size=4 * 2 ** 20, max_workers=workers)
+            print(f'{workers} workers: {perf_counter() - start:.3f}s', result == expected)
+
 print('#' * 52 + ' #### Membership Tests  ')
 print('#' * 52 + ' We can use the `in` and `not in` operators to test the presence of a **key** in a dictionary:  ')
 
@@ -250,6 +388,84 @@ for c in text:
 for cat in categories:
     print(f'{cat}:', ''.join(categories[cat]))
 
+print('#' * 52 + ' Each of these versions of `cat_key` rebuilds its lookup structure on every call. We should build'
+                 ' the category map just once. Better still, if we want the set of characters in each category, we'
+                 ' can compile the map into one `frozenset` per category and let set intersections do the'
+                 ' classification of a whole text at once: ')
+
+category_map = dict(chain({' ': None}.items(),
+                          dict.fromkeys(string.ascii_lowercase, 'lower').items(),
+                          dict.fromkeys(string.ascii_uppercase, 'upper').items()))
+
+
+def cat_key(c):
+    return category_map.get(c, 'other')
+
+
+def compile_classifier(category_map, default='other'):
+    members = {}
+    for c, category in category_map.items():
+        if category is not None:
+            members.setdefault(category, set()).add(c)
+    members = {category: frozenset(chars) for category, chars in members.items()}
+    known = frozenset(category_map)
+
+    def classify(text):
+        chars = set(text)
+        result = {category: chars & category_chars for category, category_chars in members.items()}
+        if default is not None:
+            result[default] = result.get(default, set()) | (chars - known)
+        return {category: chars for category, chars in result.items() if chars}
+
+    return classify
+
+
+classify = compile_classifier(category_map)
+print(cat_key('a'), cat_key('A'), cat_key('!'), cat_key(' '))
+
+
+def group_with_setdefault(text):
+    categories = {}
+    for c in text:
+        key = cat_key(c)
+        if key:
+            categories.setdefault(key, set()).add(c)
+    return categories
+
+
+categories = group_with_setdefault(text)
+print(classify(text) == categories)
+for cat, chars in classify(text).items():
+    print(f'{cat}:', ''.join(sorted(chars)))
+
+print('#' * 52 + ' When the categories come from an arbitrary `key` function we cannot use set intersections, but we'
+                 ' can still avoid most of the work: `categories.setdefault(key, set())` creates a throwaway `set()`'
+                 ' on every iteration, and most characters are repeats anyway. So we deduplicate the text first,'
+                 ' classify only the unique characters, and add them to buckets created up front (a category we did'
+                 ' not know about up front simply gets its bucket the first time we see it): ')
+
+
+def group_by_category(text, key=cat_key, categories=('lower', 'upper', 'other')):
+    buckets = {category: set() for category in categories}
+    for c in set(text):
+        category = key(c)
+        if category:
+            bucket = buckets.get(category)
+            if bucket is None:
+                bucket = buckets[category] = set()
+            bucket.add(c)
+    return {category: chars for category, chars in buckets.items() if chars}
+
+
+print(group_by_category(text) == categories)
+print(group_by_category('abc!', key=lambda c: 'vowel' if c in 'aeiou' else 'consonant', categories=()))
+
+if __name__ == '__main__':
+    big_text = text * 10_000
+    print(timeit('group_with_setdefault(big_text)', globals=globals(), number=1))
+    print(timeit('group_by_category(big_text)', globals=globals(), number=1))
+    print(timeit('classify(big_text)', globals=globals(), number=1))
+
 print('#' * 52 + '  #### Clearing All Items ')
 print('#' * 52 + ' If we want to remove all the keys in a dictionary, we can use the `clear` method: ')
 
@@ -182,3 +182,200 @@ result = {key: d1.get(key) or d2.get(key)
          for key in d1.keys() ^ d2.keys()}
 print(result)
 
+print('#' * 52 + ' There is a catch though: `d1.get(key) or d2.get(key)` gives the wrong answer when the value'
+                 ' itself is falsy (`0`, `None`, an empty string, ...), and it probes both dictionaries for every'
+                 ' key. We can walk each dictionary once instead, keeping the keys the other one does not have -'
+                 ' and, for more than two dictionaries, keep track of the keys we have seen more than once: ')
+
+
+def symmetric_merge(*dicts):
+    if len(dicts) == 2:
+        d1, d2 = dicts
+        result = {k: v for k, v in d1.items() if k not in d2}
+        result.update({k: v for k, v in d2.items() if k not in d1})
+        return result
+    result, repeated = {}, set()
+    for d in dicts:
+        for k, v in d.items():
+            if k in repeated:
+                continue
+            if k in result:
+                del result[k]
+                repeated.add(k)
+            else:
+                result[k] = v
+    return result
+
+
+d1 = {'a': 1, 'b': 2, 'c': 3, 'd': 0}
+d2 = {'a': 10, 'b': 20, 'c': 30, 'e': None}
+print({key: d1.get(key) or d2.get(key) for key in d1.keys() ^ d2.keys()})
+print(symmetric_merge(d1, d2))
+print(symmetric_merge(d1, d2, {'b': 200, 'f': ''}))
+
+from timeit import timeit
+
+big_1 = {k: k for k in range(0, 1_000_000)}
+big_2 = {k: k for k in range(500_000, 1_500_000)}
+print(timeit('{key: big_1.get(key) or big_2.get(key) for key in big_1.keys() ^ big_2.keys()}',
+             globals=globals(), number=3))
+print(timeit('symmetric_merge(big_1, big_2)', globals=globals(), number=3))
+
+print('#' * 52 + ' Each of these set operations on views builds a brand new `set`, so an expression such as'
+                 ' `(a.keys() & b.keys()) - c.keys()` creates a full temporary set for every operator. Instead we'
+                 ' can build the expression lazily, and only evaluate it when it is iterated. Membership tests'
+                 ' compose without building anything, and intersections iterate over the smaller operand: ')
+
+
+_missing = object()
+
+
+class LazyKeys:
+    def __init__(self, source):
+        self.source = source
+
+    def __contains__(self, key):
+        return key in self.source
+
+    def __iter__(self):
+        return iter(self.source)
+
+    def __bool__(self):
+        # without this every expression would be truthy - we only need to find a single key
+        return next(iter(self), _missing) is not _missing
+
+    def size_hint(self):
+        return len(self.source)
+
+    @staticmethod
+    def _wrap(other):
+        return other if isinstance(other, LazyKeys) else LazyKeys(other)
+
+    def __and__(self, other):
+        return LazyIntersection(self, self._wrap(other))
+
+    def __or__(self, other):
+        return LazyUnion(self, self._wrap(other))
+
+    def __sub__(self, other):
+        return LazyDifference(self, self._wrap(other))
+
+    def __xor__(self, other):
+        return LazySymmetricDifference(self, self._wrap(other))
+
+    def __rand__(self, other):
+        return LazyIntersection(self._wrap(other), self)
+
+    def __ror__(self, other):
+        return LazyUnion(self._wrap(other), self)
+
+    def __rsub__(self, other):
+        return LazyDifference(self._wrap(other), self)
+
+    def __rxor__(self, other):
+        return LazySymmetricDifference(self._wrap(other), self)
+
+
+class LazyIntersection(LazyKeys):
+    def __init__(self, left, right):
+        self.left, self.right = left, right
+
+    def __contains__(self, key):
+        return key in self.left and key in self.right
+
+    def __iter__(self):
+        smaller, larger = sorted((self.left, self.right), key=lambda operand: operand.size_hint())
+        return (key for key in smaller if key in larger)
+
+    def size_hint(self):
+        return min(self.left.size_hint(), self.right.size_hint())
+
+
+class LazyUnion(LazyKeys):
+    def __init__(self, left, right):
+        self.left, self.right = left, right
+
+    def __contains__(self, key):
+        return key in self.left or key in self.right
+
+    def __iter__(self):
+        yield from self.left
+        yield from (key for key in self.right if key not in self.left)
+
+    def size_hint(self):
+        return self.left.size_hint() + self.right.size_hint()
+
+
+class LazyDifference(LazyKeys):
+    def __init__(self, left, right):
+        self.left, self.right = left, right
+
+    def __contains__(self, key):
+        return key in self.left and key not in self.right
+
+    def __iter__(self):
+        return (key for key in self.left if key not in self.right)
+
+    def size_hint(self):
+        return self.left.size_hint()
+
+
+class LazySymmetricDifference(LazyKeys):
+    def __init__(self, left, right):
+        self.left, self.right = left, right
+
+    def __contains__(self, key):
+        return (key in self.left) != (key in self.right)
+
+    def __iter__(self):
+        yield from (key for key in self.left if key not in self.right)
+        yield from (key for key in self.right if key not in self.left)
+
+    def size_hint(self):
+        return self.left.size_hint() + self.right.size_hint()
+
+
+d1 = {'a': 1, 'b': 2, 'c': 3, 'd': 4}
+d2 = {'a': 10, 'b': 20, 'c': 30, 'e': 5}
+d3 = {'b': 200, 'x': 0}
+
+keys = (LazyKeys(d1) & d2.keys()) - d3.keys()
+print(type(keys), 'a' in keys, 'b' in keys, list(keys))
+print(set(keys) == (d1.keys() & d2.keys()) - d3.keys())
+print(set(LazyKeys(d1) ^ d2) == d1.keys() ^ d2.keys())
+print(set(LazyKeys(d1) | d2 | d3) == d1.keys() | d2.keys() | d3.keys())
+print(list((LazyKeys(d1) & d2) & d3), list(LazyKeys(d1) & (LazyKeys(d2) - d3)), list((LazyKeys(d1) | d3) & d2))
+print(bool(LazyKeys(d1) & d2), bool((LazyKeys(d3) & d1) - d2), bool(LazyKeys({}) | {}))
+
+print('#' * 52 + ' Note that the expression has to start with a `LazyKeys` - a view on the left of the operator,'
+                 ' as in `d1.keys() & LazyKeys(d2)`, never gets to the reflected `__rand__`: `dict_keys` accepts any'
+                 ' iterable as its other operand, and simply returns an eager `set`. Plain sets and frozensets on'
+                 ' the left do fall back to the reflected operators: ')
+
+print(type(d1.keys() & LazyKeys(d2)), type({'a', 'b'} & LazyKeys(d2)))
+
+print('#' * 52 + ' Lets compare the two for a reconciliation of three large dictionaries: ')
+
+big_1 = dict.fromkeys(range(0, 1_000_000))
+big_2 = dict.fromkeys(range(500_000, 1_500_000))
+big_3 = dict.fromkeys(range(0, 1_000_000, 2))
+
+print(timeit('sum(1 for _ in (big_1.keys() & big_2.keys()) - big_3.keys())', globals=globals(), number=3))
+print(timeit('sum(1 for _ in (LazyKeys(big_1) & big_2) - big_3)', globals=globals(), number=3))
+
+print('#' * 52 + ' The set operators run in C, so they are faster - what the lazy version saves is memory,'
+                 ' since no temporary sets are ever built: ')
+
+import tracemalloc
+
+
+def peak_memory(expression):
+    tracemalloc.start()
+    sum(1 for _ in eval(expression))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+print(peak_memory('(big_1.keys() & big_2.keys()) - big_3.keys()'))
+print(peak_memory('(LazyKeys(big_1) & big_2) - big_3'))
@@ -83,6 +83,211 @@ print(config_dev)
 config_prod = {**conf_defaults, **conf_global, **conf_prod}
 print(config_prod)
 
+print('#' * 52 + ' Every one of these configurations is a full copy of all the keys. If we derive thousands of'
+                 ' configurations from the same large base, we can instead use an immutable hash array mapped trie'
+                 ' (HAMT): keys are placed in a tree of 32-way nodes by successive 5-bit slices of their hash,'
+                 ' and `update` returns a **new** map that copies only the nodes on the paths to the changed keys'
+                 ' - everything else is shared with the original: ')
+
+from collections.abc import Mapping
+
+
+class _Node:
+    __slots__ = ('bitmap', 'entries')
+
+    def __init__(self, bitmap, entries):
+        self.bitmap = bitmap
+        self.entries = entries  # sub-nodes, collisions or (hash, key, value) leaves
+
+
+class _Collision:
+    __slots__ = ('hash', 'items')
+
+    def __init__(self, hash_, items):
+        self.hash = hash_
+        self.items = items  # (key, value) pairs whose keys share the full hash
+
+
+_EMPTY = _Node(0, ())
+
+
+def _entry_hash(entry):
+    return entry.hash if isinstance(entry, _Collision) else entry[0]
+
+
+def _join(shift, entry_1, entry_2):
+    hash_1, hash_2 = _entry_hash(entry_1), _entry_hash(entry_2)
+    bit_1, bit_2 = (hash_1 >> shift) & 31, (hash_2 >> shift) & 31
+    if bit_1 == bit_2:
+        return _Node(1 << bit_1, (_join(shift + 5, entry_1, entry_2),))
+    if bit_1 > bit_2:
+        entry_1, entry_2 = entry_2, entry_1
+    return _Node((1 << bit_1) | (1 << bit_2), (entry_1, entry_2))
+
+
+def _assoc(node, shift, hash_, key, value):
+    bit = 1 << ((hash_ >> shift) & 31)
+    index = (node.bitmap & (bit - 1)).bit_count()
+    leaf = (hash_, key, value)
+    if not node.bitmap & bit:
+        return _Node(node.bitmap | bit, node.entries[:index] + (leaf,) + node.entries[index:]), True
+    entry = node.entries[index]
+    if isinstance(entry, _Node):
+        new, added = _assoc(entry, shift + 5, hash_, key, value)
+    elif isinstance(entry, _Collision):
+        if entry.hash == hash_:
+            items = tuple((k, v) for k, v in entry.items if not (k is key or k == key))
+            new, added = _Collision(hash_, items + ((key, value),)), len(items) == len(entry.items)
+        else:
+            new, added = _join(shift + 5, entry, leaf), True
+    elif entry[0] == hash_ and (entry[1] is key or entry[1] == key):
+        if entry[2] is value:
+            return node, False
+        new, added = leaf, False
+    elif entry[0] == hash_:
+        new, added = _Collision(hash_, ((entry[1], entry[2]), (key, value))), True
+    else:
+        new, added = _join(shift + 5, entry, leaf), True
+    if new is entry:
+        return node, False
+    return _Node(node.bitmap, node.entries[:index] + (new,) + node.entries[index + 1:]), added
+
+
+def _dissoc(node, shift, hash_, key):
+    bit = 1 << ((hash_ >> shift) & 31)
+    if not node.bitmap & bit:
+        return node
+    index = (node.bitmap & (bit - 1)).bit_count()
+    entry = node.entries[index]
+    if isinstance(entry, _Node):
+        new = _dissoc(entry, shift + 5, hash_, key)
+        if new is entry:
+            return node
+        if new is not None and len(new.entries) == 1 and not isinstance(new.entries[0], _Node):
+            new = new.entries[0]  # pull a lone leaf or collision back up
+    elif isinstance(entry, _Collision):
+        if entry.hash != hash_:
+            return node
+        items = tuple((k, v) for k, v in entry.items if not (k is key or k == key))
+        if len(items) == len(entry.items):
+            return node
+        new = (hash_, *items[0]) if len(items) == 1 else _Collision(hash_, items)
+    elif entry[0] == hash_ and (entry[1] is key or entry[1] == key):
+        new = None
+    else:
+        return node
+    if new is not None:
+        return _Node(node.bitmap, node.entries[:index] + (new,) + node.entries[index + 1:])
+    if node.bitmap == bit:
+        return None
+    return _Node(node.bitmap & ~bit, node.entries[:index] + node.entries[index + 1:])
+
+
+def _find(node, hash_, key):
+    shift = 0
+    while True:
+        bit = 1 << ((hash_ >> shift) & 31)
+        if not node.bitmap & bit:
+            raise KeyError(key)
+        entry = node.entries[(node.bitmap & (bit - 1)).bit_count()]
+        if isinstance(entry, _Node):
+            node, shift = entry, shift + 5
+        elif isinstance(entry, _Collision):
+            if entry.hash == hash_:
+                for k, v in entry.items:
+                    if k is key or k == key:
+                        return v
+            raise KeyError(key)
+        elif entry[0] == hash_ and (entry[1] is key or entry[1] == key):
+            return entry[2]
+        else:
+            raise KeyError(key)
+
+
+def _iter_items(node):
+    for entry in node.entries:
+        if isinstance(entry, _Node):
+            yield from _iter_items(entry)
+        elif isinstance(entry, _Collision):
+            yield from entry.items
+        else:
+            yield entry[1], entry[2]
+
+
+def _hash(key):
+    return hash(key) & 0xFFFF_FFFF_FFFF_FFFF
+
+
+class PersistentMap(Mapping):
+    def __init__(self, *args, **kwargs):
+        self._root, self._len = _EMPTY, 0
+        self._root, self._len = self._assoc_all(dict(*args, **kwargs))
+
+    def _assoc_all(self, items):
+        root, length = self._root, self._len
+        for key, value in items.items():
+            root, added = _assoc(root, 0, _hash(key), key, value)
+            length += added
+        return root, length
+
+    @classmethod
+    def _from_root(cls, root, length):
+        new = cls.__new__(cls)
+        new._root, new._len = root, length
+        return new
+
+    def __getitem__(self, key):
+        return _find(self._root, _hash(key), key)
+
+    def __iter__(self):
+        return (key for key, _ in _iter_items(self._root))
+
+    def __len__(self):
+        return self._len
+
+    def set(self, key, value):
+        return self.update({key: value})
+
+    def update(self, *args, **kwargs):
+        root, length = self._assoc_all(dict(*args, **kwargs))
+        return self if root is self._root else self._from_root(root, length)
+
+    def delete(self, key):
+        root = _dissoc(self._root, 0, _hash(key), key)
+        if root is self._root:
+            raise KeyError(key)
+        return self._from_root(root or _EMPTY, self._len - 1)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({dict(_iter_items(self._root))})'
+
+    def __reduce__(self):
+        # the nodes are laid out by hash(), which differs between interpreters, so pickle the items instead
+        return type(self), (dict(_iter_items(self._root)),)
+
+
+conf_base = PersistentMap(conf_defaults).update(conf_global)
+config_dev = conf_base.update(conf_dev)
+config_prod = conf_base.update(conf_prod)
+print(config_dev)
+print(dict(config_dev) == {**conf_defaults, **conf_global, **conf_dev})
+print(dict(config_prod) == {**conf_defaults, **conf_global, **conf_prod})
+print(conf_base['database'], config_prod['database'], len(config_prod.delete('pwd')))
+
+import pickle
+
+print(pickle.loads(pickle.dumps(config_prod)) == config_prod)
+
+print('#' * 52 + ' Lets derive a thousand tenant configurations from a large shared base: ')
+
+from timeit import timeit
+
+big_base = {f'setting_{i}': i for i in range(10_000)}
+persistent_base = PersistentMap(big_base)
+tenants = [{'host': f'tenant{i}.deepdive.com', 'user': f'user{i}', 'setting_7': i} for i in range(1_000)]
+print(timeit('[{**big_base, **tenant} for tenant in tenants]', globals=globals(), number=1))
+print(timeit('[persistent_base.update(tenant) for tenant in tenants]', globals=globals(), number=1))
+
 print('#' * 52 + ' Another way dictionary unpacking can be really useful,'
                  ' is for passing keyword arguments to a function:  ')
 
@@ -105,6 +310,65 @@ def my_func(**kwargs):
 
 print(my_func(**d))
 
+print('#' * 52 + ' If we call the same keyword-only function over millions of record dictionaries, every `**d`'
+                 ' builds a fresh keyword argument dictionary. Since the signature does not change, we can resolve'
+                 ' the parameters once and generate a call that looks each one up in the record directly'
+                 ' (keys the function does not take are ignored, rather than raising a `TypeError`): ')
+
+import inspect
+from concurrent.futures import ProcessPoolExecutor
+
+
+class CallAdapter:
+    def __init__(self, func):
+        self.func = func
+        params = inspect.signature(func).parameters.values()
+        unsupported = [p.name for p in params
+                       if p.kind not in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY)]
+        if unsupported:
+            raise TypeError(f'CallAdapter only supports named parameters, not {unsupported}')
+        defaults = {p.name: p.default for p in params if p.default is not p.empty}
+        args = []
+        for p in params:
+            value = f'r.get({p.name!r}, defaults[{p.name!r}])' if p.name in defaults else f'r[{p.name!r}]'
+            args.append(value if p.kind is p.POSITIONAL_OR_KEYWORD else f'{p.name}={value}')
+        self.call = eval(f'lambda r: func({", ".join(args)})', {'func': func, 'defaults': defaults})
+
+    def __call__(self, record):
+        return self.call(record)
+
+    def __reduce__(self):
+        # the generated lambda cannot be pickled, so rebuild it on the other side
+        return type(self), (self.func,)
+
+
+def apply_records(func, records, executor=None, chunksize=1_000):
+    adapter = CallAdapter(func)
+    if executor is None:
+        return map(adapter.call, records)  # skip the extra __call__ layer when staying in this process
+    return executor.map(adapter, records, chunksize=chunksize)
+
+
+def my_func(*, kw1, kw2, kw3=0):
+    return kw1 + kw2 * kw3
+
+
+d = {'kw2': 20, 'kw3': 30, 'kw1': 10}
+adapter = CallAdapter(my_func)
+print(my_func(**d), adapter(d), adapter({'kw1': 1, 'kw2': 2}))
+
+records = [{'kw1': i, 'kw2': i % 7, 'kw3': i % 3} for i in range(200_000)]
+print(list(apply_records(my_func, records)) == [my_func(**r) for r in records])
+
+from timeit import timeit
+
+print(timeit('[my_func(**r) for r in records]', globals=globals(), number=5))
+print(timeit('list(map(adapter.call, records))', globals=globals(), number=5))
+
+if __name__ == '__main__':
+    with ProcessPoolExecutor() as executor:
+        print(sum(apply_records(my_func, records, executor, chunksize=10_000)))
+
 print('#' * 52 + ' #### Copying Dictionaries  ')
 d = {'a': [1, 2], 'b': [3, 4]}
 d1 = d.copy()
@@ -167,6 +431,94 @@ d1['posts'].append(300)
 print(d1)
 print(d)
 
+print('#' * 52 + ' `deepcopy` has to handle any kind of object, so it goes through a memo dictionary and the'
+                 ' `__deepcopy__` / `__reduce_ex__` protocols for every single value. For JSON-shaped data - dicts,'
+                 ' lists, and immutable str/int/float/bool/None leaves - we can do better. We walk the tree'
+                 ' with an explicit stack instead of recursing, and only keep a memo of the copies when asked to,'
+                 ' which lets us copy shared or cyclic structures. Without the memo we still remember which'
+                 ' containers we have seen, and raise a `ValueError` on the first one we meet twice - otherwise a'
+                 ' cycle would be copied forever. On the payload below this comes out about 3 times faster than'
+                 ' `deepcopy` - not quite the 5x we might hope for, as keeping track of the containers costs'
+                 ' almost as much as copying them: ')
+
+_atomic_types = frozenset((str, int, float, bool, type(None)))
+
+
+def fast_deepcopy(obj, detect_cycles=False):
+    if type(obj) in _atomic_types:
+        return obj
+    if type(obj) not in (dict, list):
+        raise TypeError(f'fast_deepcopy cannot copy {type(obj).__name__} objects')
+    # every container starts out as a shallow copy (done in C); we then only replace its nested containers
+    root = dict(obj) if type(obj) is dict else obj[:]
+    memo = {id(obj): root} if detect_cycles else None
+    seen = None if detect_cycles else {id(obj)}
+    stack = [root]
+    while stack:
+        target = stack.pop()
+        for key, value in (target.items() if type(target) is dict else enumerate(target)):
+            value_type = type(value)
+            if value_type in _atomic_types:
+                continue
+            if value_type is not dict and value_type is not list:
+                raise TypeError(f'fast_deepcopy cannot copy {value_type.__name__} objects')
+            if memo is None:
+                # a container we have already copied means a shared or cyclic structure, which we
+                # would otherwise copy over and over again
+                if id(value) in seen:
+                    raise ValueError('data contains shared or cyclic references - use detect_cycles=True')
+                seen.add(id(value))
+            elif id(value) in memo:
+                target[key] = memo[id(value)]
+                continue
+            copied = dict(value) if value_type is dict else value[:]
+            if memo is not None:
+                memo[id(value)] = copied
+            target[key] = copied
+            stack.append(copied)
+    return root
+
+d = {'id': 123445,
+    'person': {
+        'name': 'John',
+        'age': 78},
+     'posts': [100, 105, 200]
+    }
+
+d1 = fast_deepcopy(d)
+d1['person']['name'] = 'John Cleese'
+d1['posts'].append(300)
+print(d1)
+print(d)
+
+cyclic = {'name': 'loop', 'children': []}
+cyclic['children'].append(cyclic)
+cyclic_copy = fast_deepcopy(cyclic, detect_cycles=True)
+print(cyclic_copy['children'][0] is cyclic_copy, cyclic_copy is not cyclic)
+try:
+    fast_deepcopy(cyclic)
+except ValueError as ex:
+    print(ex)
+
+branching = {}
+branching['left'] = branching['right'] = branching
+try:
+    fast_deepcopy(branching)
+except ValueError as ex:
+    print(ex)
+
+from timeit import timeit
+
+payload = [{'id': i,
+            'person': {'name': f'user {i}', 'age': i % 100, 'active': i % 2 == 0, 'manager': None},
+            'posts': list(range(i % 20)),
+            'score': i / 7}
+           for i in range(20_000)]
+print(fast_deepcopy(payload) == payload)
+print(timeit('deepcopy(payload)', globals=globals(), number=1))
+print(timeit('fast_deepcopy(payload)', globals=globals(), number=1))
+print(timeit('fast_deepcopy(payload, detect_cycles=True)', globals=globals(), number=1))
+
 print('#' * 52 + ' We saw earlier that we can also copy a dictionary by essentially unpacking the keys of one,'
                  ' or more dictionaries, into another.This also creates a **shallow** copy: ')
 
@@ -177,6 +529,87 @@ d1['a'].append(100)
 print(d1)
 print(d)
 
+print('#' * 52 + ' Even a shallow copy has to copy the whole hash table, and often the copy is made defensively'
+                 ' and then only ever read. A copy-on-write dictionary can make `copy()` free: both objects share'
+                 ' the same table until one of them is written to, at which point that one takes a private copy: ')
+
+from collections.abc import MutableMapping
+
+
+class CowDict(MutableMapping):
+    def __init__(self, *args, **kwargs):
+        self._table = [dict(*args, **kwargs), 1]  # [data, number of CowDicts sharing it]
+
+    def copy(self):
+        new = type(self).__new__(type(self))
+        new._table = self._table
+        self._table[1] += 1
+        return new
+
+    # copy.copy would otherwise share the table without counting the new owner
+    __copy__ = copy
+
+    def _writable(self):
+        # owners are not counted down when a copy is garbage collected, so at worst we copy once too often
+        data, owners = self._table
+        if owners > 1:
+            self._table[1] -= 1
+            self._table = [dict(data), 1]
+        return self._table[0]
+
+    def __getitem__(self, key):
+        return self._table[0][key]
+
+    def __contains__(self, key):
+        return key in self._table[0]
+
+    def __iter__(self):
+        return iter(self._table[0])
+
+    def __len__(self):
+        return len(self._table[0])
+
+    def __setitem__(self, key, value):
+        self._writable()[key] = value
+
+    def __delitem__(self, key):
+        del self._writable()[key]
+
+    def clear(self):
+        if self._table[1] > 1:
+            self._table[1] -= 1
+            self._table = [{}, 1]
+        else:
+            self._table[0].clear()
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self._table[0]})'
+
+
+d = CowDict(a=[1, 2], b=[3, 4])
+d1 = d.copy()
+print(d._table is d1._table)
+d1['c'] = 100
+print(d, d1, d._table is d1._table)
+
+print('#' * 52 + ' The `copy` module goes through the same method, so `copy.copy` gives us a copy-on-write copy as well: ')
+
+import copy
+
+d2 = copy.copy(d)
+d2['z'] = 9
+print(d, d2)
+
+print('#' * 52 + ' Note that this is still a **shallow** copy - the values themselves are shared just like with'
+                 ' `d.copy()`. The copy itself on the other hand costs nothing, however large the dictionary is: ')
+
+from timeit import timeit
+
+cow_big = CowDict({k: k for k in range(1_000_000)})
+plain_big = dict(cow_big)
+print(timeit('plain_big.copy()', globals=globals(), number=10))
+print(timeit('cow_big.copy()', globals=globals(), number=10))
+
 print('#' * 52 + '  ')
 from random import randint
 
@@ -201,6 +634,8 @@ def copy_comprehension(d):
 print('#' * 52 + '  ')
 from timeit import timeit
 
+# benchmarks.py at the top of the repository runs these (and the other timings) across sizes, key and
+# value types, with warmup and repeats, and can write the results as JSON: python benchmarks.py --suite dict_copy
 print(timeit('copy_unpacking(big_d)', globals=globals(), number=100))
 print(timeit('copy_copy(big_d)', globals=globals(), number=100))
 print(timeit('copy_create(big_d)', globals=globals(), number=100))
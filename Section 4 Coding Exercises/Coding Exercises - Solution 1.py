@@ -19,3 +19,179 @@ def sort_dict_by_value(d):
 
 print(sort_dict_by_value(composers))
 
+
+print('#' * 52 + '  If we only need the leaders of a large dictionary, sorting everything is wasteful. '
+                 '  `heapq.nsmallest` / `heapq.nlargest` select the top `k` items in O(n log k), and '
+                 '  `operator.itemgetter` gives us a key function without the overhead of a lambda: ')
+
+import heapq
+from operator import itemgetter
+
+
+def sort_dict_by_value(d, k=None, reverse=False):
+    by_value = itemgetter(1)
+    if k is None:
+        return dict(sorted(d.items(), key=by_value, reverse=reverse))
+    select = heapq.nlargest if reverse else heapq.nsmallest
+    return dict(select(k, d.items(), key=by_value))
+
+
+print(sort_dict_by_value(composers))
+print(sort_dict_by_value(composers, reverse=True))
+print(sort_dict_by_value(composers, k=2))
+print(sort_dict_by_value(composers, k=2, reverse=True))
+
+print('#' * 52 + '  Lets compare a full sort with the partial selection when we only want the top 100: ')
+
+from random import randint
+from timeit import timeit
+
+scores = {f'player_{i}': randint(1, 1_000_000) for i in range(500_000)}
+
+print(timeit('dict(sorted(scores.items(), key=lambda el: el[1], reverse=True)[:100])',
+             globals=globals(), number=5))
+print(timeit('sort_dict_by_value(scores, k=100, reverse=True)', globals=globals(), number=5))
+
+print('#' * 52 + '  If the dictionary is updated often, re-sorting it after every change is expensive. '
+                 '  Instead we can keep a secondary index of `(value, sequence, key)` tuples sorted with `bisect`, '
+                 '  so the value order is always ready. The sequence number keeps ties in insertion order and '
+                 '  means we never have to compare keys: ')
+
+from bisect import bisect_left, insort
+from collections.abc import MutableMapping
+from itertools import count, islice
+
+
+class ValueSortedDict(MutableMapping):
+    def __init__(self, *args, **kwargs):
+        self._data = {}  # key -> (value, sequence)
+        self._index = []  # sorted (value, sequence, key)
+        self._counter = count()
+        self.update(*args, **kwargs)
+
+    def __getitem__(self, key):
+        return self._data[key][0]
+
+    def __setitem__(self, key, value):
+        entry = (value, next(self._counter))
+        # insert first: if the new value cannot be compared with the others, nothing has changed yet
+        insort(self._index, (*entry, key))
+        if key in self._data:
+            self._remove_from_index(key)
+        self._data[key] = entry
+
+    def __delitem__(self, key):
+        self._remove_from_index(key)
+        del self._data[key]
+
+    def _remove_from_index(self, key):
+        value, seq = self._data[key]
+        del self._index[bisect_left(self._index, (value, seq))]
+
+    def __iter__(self):
+        return (key for *_, key in self._index)
+
+    def __reversed__(self):
+        return (key for *_, key in reversed(self._index))
+
+    def __len__(self):
+        return len(self._data)
+
+    def top(self, k, reverse=False):
+        index = islice(reversed(self._index), k) if reverse else self._index[:k]
+        return {key: value for value, _, key in index}
+
+    def __repr__(self):
+        return f'{type(self).__name__}({dict(self.items())})'
+
+
+leaderboard = ValueSortedDict(composers)
+print(leaderboard)
+leaderboard['Johann'] = 10
+leaderboard['Franz'] = 31
+del leaderboard['Ludwig']
+print(leaderboard)
+print(leaderboard.top(2), leaderboard.top(2, reverse=True), leaderboard.top(0, reverse=True))
+try:
+    leaderboard['Johann'] = 'unknown'
+except TypeError as ex:
+    print(ex)
+print(leaderboard, len(leaderboard) == len(list(leaderboard)))
+
+print('#' * 52 + '  Compare re-sorting after every update with maintaining the index incrementally: ')
+
+small_scores = dict(list(scores.items())[:50_000])
+leaderboard = ValueSortedDict(small_scores)
+updates = [(f'player_{randint(0, 49_999)}', randint(1, 1_000_000)) for _ in range(10)]
+
+
+def resort_after_updates(d):
+    for k, v in updates:
+        d[k] = v
+        sort_dict_by_value(d)
+
+
+def incremental_updates(d):
+    for k, v in updates:
+        d[k] = v
+
+
+print(timeit('resort_after_updates(small_scores)', globals=globals(), number=1))
+print(timeit('incremental_updates(leaderboard)', globals=globals(), number=1))
+
+print('#' * 52 + '  For very large dictionaries with numeric values we can hand the sorting over to NumPy: we pull '
+                 '  the keys and values into arrays, let `numpy.argsort` (stable) compute the ordering, and build '
+                 '  the result from the reordered arrays. The values must all be ints (that fit in 64 bits) or all '
+                 '  be floats - a mix would be converted to float64 and lose precision. If NumPy is not installed, '
+                 '  the values do not qualify, or the dictionary is too small for the conversions to pay off, we '
+                 '  simply fall back to the pure Python version: ')
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NUMPY_MIN_SIZE = 10_000
+
+
+def sort_dict_by_value_numpy(d, reverse=False):
+    if np is None or len(d) < NUMPY_MIN_SIZE:
+        return sort_dict_by_value(d, reverse=reverse)
+    value_types = set(map(type, d.values()))
+    if value_types == {int}:
+        dtype = np.int64
+    elif value_types == {float}:
+        dtype = np.float64
+    else:
+        return sort_dict_by_value(d, reverse=reverse)
+    try:
+        values = np.fromiter(d.values(), dtype=dtype, count=len(d))
+    except OverflowError:  # ints that do not fit in an int64
+        return sort_dict_by_value(d, reverse=reverse)
+    if reverse:
+        # stable descending order: sort the reversed array and map the indices back
+        order = len(values) - 1 - np.argsort(values[::-1], kind='stable')[::-1]
+    else:
+        order = np.argsort(values, kind='stable')
+    keys = np.fromiter(d, dtype=object, count=len(d))
+    return dict(zip(keys[order].tolist(), values[order].tolist()))
+
+
+big = {f'key_{i}': i % 7 for i in range(NUMPY_MIN_SIZE)}
+print(list(sort_dict_by_value_numpy(composers)) == list(sort_dict_by_value(composers)))
+print(list(sort_dict_by_value_numpy(big, reverse=True)) == list(sort_dict_by_value(big, reverse=True)))
+mixed = {**big, 'a': 2 ** 53 + 1, 'b': 2 ** 53 + 0.0}
+texts = {k: str(v) for k, v in big.items()}
+print(list(sort_dict_by_value_numpy(mixed))[-2:],
+      list(sort_dict_by_value_numpy(texts)) == list(sort_dict_by_value(texts)))
+
+print('#' * 52 + '  The speedup is modest - building the new dictionary costs about as much as the sort itself - '
+                 '  and below about 10,000 items the conversions to and from arrays eat it up completely: ')
+
+if np is not None:
+    for size in (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7):
+        big = {i: randint(1, 1_000_000) for i in range(size)}
+        number = max(1, 10 ** 6 // size)
+        print(size,
+              timeit('sort_dict_by_value(big)', globals=globals(), number=number) / number,
+              timeit('sort_dict_by_value_numpy(big)', globals=globals(), number=number) / number)
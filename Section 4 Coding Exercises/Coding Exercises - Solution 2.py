@@ -10,4 +10,250 @@ def intersect(d1, d2):
     return d
 
 
-print(intersect(d1, d2))
\ No newline at end of file
+print(intersect(d1, d2))
+
+print('#' * 52 + '  We can generalize this to any number of dictionaries. Rather than building all the key views '
+                 '  and intersecting them, we iterate over the keys of the smallest dictionary only and probe the '
+                 '  others, smallest first, so that a key is rejected as early as possible. If nothing survives, '
+                 '  we never look at the remaining dictionaries at all: ')
+
+
+def intersect(*dicts):
+    if not dicts:
+        return {}
+    by_size = sorted(dicts, key=len)
+    smallest, others = by_size[0], by_size[1:]
+    keys = [k for k in smallest
+            if all(k in d for d in others)]
+    return {k: tuple(d[k] for d in dicts) for k in keys}
+
+
+d3 = {'c': 300, 'b': 200, 'x': 0}
+print(intersect(d1, d2))
+print(intersect(d1, d2, d3))
+print(intersect(d1, d2, {}))
+
+print('#' * 52 + '  Lets compare this with chaining `&` over the key views for a 20-way intersection: ')
+
+from timeit import timeit
+
+shards = [{k: k for k in range(i * 1_000, 200_000 + i * 1_000)} for i in range(20)]
+shards.append({k: k for k in range(150_000, 160_000)})
+
+
+def intersect_views(*dicts):
+    keys = dicts[0].keys()
+    for d in dicts[1:]:
+        keys = keys & d.keys()
+    return {k: tuple(d[k] for d in dicts) for k in keys}
+
+
+print(intersect(*shards) == intersect_views(*shards))
+print(timeit('intersect_views(*shards)', globals=globals(), number=5))
+print(timeit('intersect(*shards)', globals=globals(), number=5))
+
+print('#' * 52 + '  When the dictionaries are too big to fit in memory we cannot hash them at all. If both inputs '
+                 '  are streams of `(key, value)` pairs sorted by key (for example JSON-lines files), we can walk '
+                 '  them side by side like a merge-join, using constant memory: ')
+
+
+def merge_join(pairs1, pairs2):
+    it1, it2 = iter(pairs1), iter(pairs2)
+    try:
+        k1, v1 = next(it1)
+        k2, v2 = next(it2)
+        while True:
+            if k1 < k2:
+                k1, v1 = next(it1)
+            elif k2 < k1:
+                k2, v2 = next(it2)
+            else:
+                yield k1, (v1, v2)
+                k1, v1 = next(it1)
+                k2, v2 = next(it2)
+    except StopIteration:
+        return
+
+
+print(dict(merge_join(sorted(d1.items()), sorted(d2.items()))))
+
+print('#' * 52 + '  Unsorted inputs first have to be sorted - in bounded memory. We sort fixed-size chunks, write '
+                 '  each sorted run to a temporary JSON-lines file, and then lazily merge the runs with '
+                 '  `heapq.merge`: ')
+
+import heapq
+import itertools
+import json
+import os
+import tempfile
+from operator import itemgetter
+
+
+def write_pairs(path, pairs):
+    with open(path, 'w') as f:
+        for k, v in pairs:
+            f.write(json.dumps([k, v]) + '\n')
+
+
+def read_pairs(path):
+    with open(path) as f:
+        for line in f:
+            k, v = json.loads(line)
+            yield k, v
+
+
+def external_sort(pairs, chunk_size=100_000):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        runs = []
+        pairs = iter(pairs)
+        while True:
+            chunk = sorted(itertools.islice(pairs, chunk_size), key=itemgetter(0))
+            if not chunk:
+                break
+            path = os.path.join(tmp_dir, f'run_{len(runs)}.jsonl')
+            write_pairs(path, chunk)
+            runs.append(path)
+        yield from heapq.merge(*(read_pairs(path) for path in runs), key=itemgetter(0))
+
+
+from random import sample
+
+with tempfile.TemporaryDirectory() as data_dir:
+    left_path = os.path.join(data_dir, 'left.jsonl')
+    right_path = os.path.join(data_dir, 'right.jsonl')
+    write_pairs(left_path, ((f'k{i:06}', i) for i in sample(range(100_000), 100_000)))
+    write_pairs(right_path, ((f'k{i:06}', -i) for i in sample(range(0, 200_000, 3), 66_667)))
+
+    joined = merge_join(external_sort(read_pairs(left_path), chunk_size=10_000),
+                        external_sort(read_pairs(right_path), chunk_size=10_000))
+    result = dict(joined)
+    print(len(result), list(result.items())[:3])
+    print(result == intersect(dict(read_pairs(left_path)), dict(read_pairs(right_path))))
+
+print('#' * 52 + '  If one of the dictionaries lives in another process, shipping all its keys across a pipe can '
+                 '  cost more than the intersection itself. A Bloom filter is a compact bit array summary of a '
+                 '  set of keys: it never gives false negatives, and its false-positive rate is configurable. We '
+                 '  only send the filter, use it to prefilter our own keys, and ask for exact values for the '
+                 '  (few) candidates. Both processes must hash a key the same way, so the filter hashes a '
+                 '  canonical encoding of it (see `stable_keys.py`), which limits the keys to None, strings, '
+                 '  bytes, numbers, and tuples and frozensets of those: ')
+
+import math
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import blake2b
+from time import perf_counter
+
+from stable_keys import encode_key
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(1, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    @classmethod
+    def from_keys(cls, keys, error_rate=0.01):
+        bloom = cls(len(keys), error_rate)
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+    def _positions(self, key):
+        # hash() and repr() can differ between processes, so digest a canonical encoding of the key instead
+        digest = blake2b(encode_key(key), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+bloom = BloomFilter.from_keys(d2.keys())
+print([k in bloom for k in d2], [k in bloom for k in d1])
+print(1.0 in BloomFilter.from_keys([1, 2]), (True, 'a') in BloomFilter.from_keys([(1, 'a')]),
+      frozenset('abc') in BloomFilter.from_keys([frozenset('cba')]))
+
+print('#' * 52 + '  Now lets put the second dictionary in a worker process and compare sending its full key view '
+                 '  with sending its Bloom filter: ')
+
+remote_shard = None
+remote_summaries = {}
+
+
+def init_shard(d):
+    global remote_shard
+    remote_shard = d
+    remote_summaries.clear()
+
+
+def shard_keys():
+    return list(remote_shard.keys())
+
+
+def shard_summary(error_rate):
+    # the node builds its summary once, and then keeps it up to date in shard_set
+    if error_rate not in remote_summaries:
+        remote_summaries[error_rate] = BloomFilter.from_keys(remote_shard.keys(), error_rate)
+    return remote_summaries[error_rate]
+
+
+def shard_set(items):
+    # new keys are simply added to the filters; removed keys cannot be taken out of a Bloom filter,
+    # they only add to the false positives until the node rebuilds its summary
+    for key, value in items.items():
+        if key not in remote_shard:
+            for bloom in remote_summaries.values():
+                bloom.add(key)
+        remote_shard[key] = value
+
+
+def shard_lookup(keys):
+    return {k: remote_shard[k] for k in keys if k in remote_shard}
+
+
+def intersect_remote(d, executor, error_rate=None):
+    if error_rate is None:
+        summary = executor.submit(shard_keys).result()
+        candidates = [k for k in summary if k in d]
+    else:
+        summary = executor.submit(shard_summary, error_rate).result()
+        candidates = [k for k in d if k in summary]
+    found = executor.submit(shard_lookup, candidates).result()
+    sent = sum(len(pickle.dumps(obj)) for obj in (summary, candidates, found))
+    return {k: (d[k], v) for k, v in found.items()}, sent
+
+
+if __name__ == '__main__':
+    local = {f'user_{i}': i for i in range(0, 1_000_000, 50)}
+    remote = {f'user_{i}': -i for i in range(1_000_000)}
+    with ProcessPoolExecutor(max_workers=1, initializer=init_shard, initargs=(remote,)) as executor:
+        for error_rate in (None, 0.01, 0.001):
+            build = 0
+            if error_rate is not None:
+                start = perf_counter()
+                executor.submit(shard_summary, error_rate).result()
+                build = perf_counter() - start
+            start = perf_counter()
+            result, sent = intersect_remote(local, executor, error_rate)
+            query = perf_counter() - start
+            print(f'error_rate={error_rate}: {len(result)} keys, {sent:,} bytes, '
+                  f'build {build:.3f}s + query {query:.3f}s = {build + query:.3f}s')
+
+        print('#' * 52 + '  Building the filter costs far more than shipping the keys once, so it only pays off when '
+                         '  the node builds it once, keeps it up to date incrementally, and answers many queries: ')
+
+        updates = {f'new_user_{i}': i for i in range(10_000)}
+        start = perf_counter()
+        executor.submit(shard_set, updates).result()
+        print(f'adding {len(updates):,} keys to the node and its filters: {perf_counter() - start:.3f}s')
+        start = perf_counter()
+        result, sent = intersect_remote({**local, 'new_user_7': 7}, executor, 0.01)
+        print(f'query after the update: {len(result)} keys, {sent:,} bytes, {perf_counter() - start:.3f}s')
@@ -22,3 +22,173 @@ print()
 merged = merge(d1, d2)
 for k, v in merged.items():
     print(k, v)
+
+print('#' * 52 + '  When we have to merge hundreds of large count dictionaries we can spread the work over several '
+                 '  processes, map-reduce style. Each mapper sums a chunk of the dictionaries and splits its totals '
+                 '  into partitions by a hash of the key. Each reducer sums one partition and sorts it, and finally '
+                 '  the sorted partitions are merged lazily with `heapq.merge`. Every process must send equal keys '
+                 '  to the same reducer, so the hash is taken of a canonical encoding of the key (see '
+                 '  `stable_keys.py`) - not of `hash()` or `repr()`, which can differ from process to process: ')
+
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from zlib import crc32
+
+from stable_keys import encode_key
+
+
+def partition_of(key, partitions):
+    # hash() is randomized per process, and mappers must agree on where a key goes
+    return crc32(encode_key(key)) % partitions
+
+
+def add_counts(totals, counts):
+    # Counter.update loops in Python when given a mapping, so this plain loop is just as fast
+    get = totals.get
+    for k, v in counts.items():
+        totals[k] = get(k, 0) + v
+
+
+def map_counts(dicts, partitions):
+    totals = {}
+    for d in dicts:
+        add_counts(totals, d)
+    parts = [{} for _ in range(partitions)]
+    for k, v in totals.items():
+        parts[partition_of(k, partitions)][k] = v
+    return parts
+
+
+def reduce_counts(parts):
+    totals = {}
+    for part in parts:
+        add_counts(totals, part)
+    return sorted(totals.items(), key=itemgetter(1), reverse=True)
+
+
+def merge_parallel(*dicts, workers=None):
+    workers = workers or os.cpu_count()
+    chunks = [dicts[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        mapped = list(executor.map(map_counts, chunks, [workers] * workers))
+        runs = list(executor.map(reduce_counts, zip(*mapped)))
+    return dict(heapq.merge(*runs, key=itemgetter(1), reverse=True))
+
+
+if __name__ == '__main__':
+    merged = merge_parallel(d1, d2, d3, workers=2)
+    for k, v in merged.items():
+        print(k, v)
+    print(merge_parallel({1: 1}, {1.0: 2}, {True: 4}, workers=3), merge({1: 1}, {1.0: 2}, {True: 4}))
+    print(merge_parallel(*[{frozenset('wxyz'): 1}] * 8, {'a': 1}, {'b': 2}, workers=4))
+
+    print('#' * 52 + '  Lets see how this scales with the number of cores. Every dictionary has to be pickled and '
+                     '  sent to a worker, and the partitions sent back, which costs about as much as the serial '
+                     '  merge itself: with a single worker the parallel version takes roughly twice as long, so it '
+                     '  needs at least 3 cores (more under `spawn`, which starts each worker from scratch) to pay off: ')
+
+    from random import randint, sample
+    from time import perf_counter
+
+    vocabulary = [f'word_{i}' for i in range(200_000)]
+    count_dicts = [{w: randint(1, 100) for w in sample(vocabulary, 20_000)} for _ in range(100)]
+
+    start = perf_counter()
+    expected = merge(*count_dicts)
+    print(f'serial: {perf_counter() - start:.3f}s')
+
+    cores = os.cpu_count()
+    for workers in sorted({cores} | {2 ** i for i in range(8) if 2 ** i < cores}):
+        start = perf_counter()
+        merged = merge_parallel(*count_dicts, workers=workers)
+        print(f'{workers} workers: {perf_counter() - start:.3f}s', merged == expected)
+
+print('#' * 52 + '  The `*dicts` signature means every input dictionary has to be in memory at the same time. '
+                 '  Instead we can accept iterators of dictionaries or NDJSON files (one count dictionary per '
+                 '  line) and fold them into the running totals one at a time. A plain JSON file is loaded in one '
+                 '  go, so it may only hold a single dictionary - a list of them has to be converted to NDJSON. '
+                 '  If we only want the leaders, `heapq.nlargest` saves us sorting everything: ')
+
+import json
+import tempfile
+import tracemalloc
+from collections.abc import Mapping
+from time import perf_counter
+
+
+def iter_count_dicts(source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source) as f:
+            if str(source).endswith(('.ndjson', '.jsonl')):
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            else:
+                data = json.load(f)
+                if not isinstance(data, dict):
+                    raise ValueError(f'{source} must contain a single JSON object - '
+                                     f'use NDJSON to stream several count dictionaries')
+                yield data
+    elif isinstance(source, Mapping):
+        yield source
+    else:
+        yield from source
+
+
+def merge_stream(*sources, top=None):
+    totals = {}
+    for source in sources:
+        for d in iter_count_dicts(source):
+            for k, v in d.items():
+                totals[k] = totals.get(k, 0) + v
+    if top is None:
+        return dict(sorted(totals.items(), key=itemgetter(1), reverse=True))
+    return dict(heapq.nlargest(top, totals.items(), key=itemgetter(1)))
+
+
+print(merge_stream(d1, iter([d2, d3])) == merge(d1, d2, d3))
+print(merge_stream(d1, d2, d3, top=3))
+
+print('#' * 52 + '  Lets compare the peak memory of loading every dictionary first with streaming them from an '
+                 '  NDJSON file: ')
+
+
+def merge_loaded(path):
+    return merge(*iter_count_dicts(path))
+
+
+def measure(func, *args, **kwargs):
+    start = perf_counter()
+    func(*args, **kwargs)
+    elapsed = perf_counter() - start
+    tracemalloc.start()
+    func(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+if __name__ == '__main__':
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        resource = None
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'counts.ndjson')
+        with open(path, 'w') as f:
+            for _ in range(50):
+                f.write(json.dumps({w: randint(1, 100) for w in sample(vocabulary, 20_000)}) + '\n')
+
+        print(list(merge_stream(path, top=5).values()) == list(merge_loaded(path).values())[:5])
+        for label, func, kwargs in (('load all', merge_loaded, {}),
+                                    ('stream', merge_stream, {}),
+                                    ('stream top 100', merge_stream, {'top': 100})):
+            elapsed, peak = measure(func, path, **kwargs)
+            print(f'{label}: {elapsed:.3f}s, peak traced memory {peak / 2 ** 20:.1f} MiB')
+
+    if resource is not None:
+        # ru_maxrss is in KiB on Linux (bytes on macOS) and covers the whole script
+        print('peak RSS of this process:', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
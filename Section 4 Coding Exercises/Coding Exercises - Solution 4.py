@@ -23,3 +23,245 @@ def identify(node1, node2, node3):
 result = identify(n1, n2, n3)
 for k, v in result.items():
     print(f'{k}: {v}')
+
+
+print('#' * 52 + '  We can generalize this to any number of nodes. Instead of a union and an intersection we can '
+                 '  record, for every key, a bitmask of the nodes it appears in - a key is relevant if its mask '
+                 '  is not "all nodes": ')
+
+
+def presence_masks(nodes):
+    masks = {}
+    for i, node in enumerate(nodes):
+        bit = 1 << i
+        for key in node:
+            masks[key] = masks.get(key, 0) | bit
+    return masks
+
+
+def identify(*nodes, default=0):
+    masks = presence_masks(nodes)
+    everywhere = (1 << len(nodes)) - 1
+    return {key: tuple(node.get(key, default) for node in nodes)
+            for key, mask in masks.items() if mask != everywhere}
+
+
+result = identify(n1, n2, n3)
+for k, v in result.items():
+    print(f'{k}: {v}')
+
+print('#' * 52 + '  With dozens of nodes, building a tuple per key gets expensive. A columnar result holds the '
+                 '  relevant keys once, one column of values per node, and the presence bitmask of each key. '
+                 '  Passing a `typecode` stores each column in a compact `array`: ')
+
+from array import array
+
+
+def identify_columnar(*nodes, default=0, typecode=None):
+    masks = presence_masks(nodes)
+    everywhere = (1 << len(nodes)) - 1
+    keys = [key for key, mask in masks.items() if mask != everywhere]
+    columns = []
+    for node in nodes:
+        column = [node.get(key, default) for key in keys]
+        columns.append(column if typecode is None else array(typecode, column))
+    return keys, columns, [masks[key] for key in keys]
+
+
+keys, columns, presence = identify_columnar(n1, n2, n3, typecode='q')
+for i, key in enumerate(keys):
+    print(f'{key}: {[column[i] for column in columns]} present={presence[i]:03b}')
+
+print('#' * 52 + '  A fleet-wide comparison of 50 nodes: ')
+
+from random import randint, random
+from timeit import timeit
+
+fleet = [{f'key_{k}': randint(1, 1000) for k in range(20_000) if random() < 0.95} for _ in range(50)]
+print(timeit('identify(*fleet)', globals=globals(), number=3))
+print(timeit("identify_columnar(*fleet, typecode='q')", globals=globals(), number=3))
+
+print('#' * 52 + '  If we poll node inventories regularly, recomputing everything when one node changes is '
+                 '  wasteful. Instead we can keep, for every key, the number of nodes that have it, and only '
+                 '  re-classify the keys a node reports as added or removed: ')
+
+
+class DivergenceTracker:
+    def __init__(self):
+        self.nodes = {}
+        self.counts = {}  # key -> number of nodes that have it
+        self.intersection = set()
+        self.relevant = set()
+
+    @property
+    def union(self):
+        return self.counts.keys()
+
+    def register(self, node_id, inventory):
+        if node_id in self.nodes:
+            raise ValueError(f'Node {node_id!r} is already registered.')
+        self.nodes[node_id] = dict(inventory)
+        for key in inventory:
+            self.counts[key] = self.counts.get(key, 0) + 1
+        self._reclassify_all()
+
+    def unregister(self, node_id):
+        for key in self.nodes.pop(node_id):
+            self.counts[key] -= 1
+            if not self.counts[key]:
+                del self.counts[key]
+        self._reclassify_all()
+
+    def update(self, node_id, changed=None, removed=()):
+        node = self.nodes[node_id]
+        for key, value in (changed or {}).items():
+            if key not in node:
+                self._classify(key, self.counts.get(key, 0) + 1)
+            node[key] = value
+        for key in removed:
+            if key in node:
+                del node[key]
+                self._classify(key, self.counts[key] - 1)
+
+    def _classify(self, key, count):
+        if count:
+            self.counts[key] = count
+        else:
+            del self.counts[key]
+        if count == len(self.nodes):
+            self.intersection.add(key)
+            self.relevant.discard(key)
+        elif count:
+            self.relevant.add(key)
+            self.intersection.discard(key)
+        else:
+            self.relevant.discard(key)
+            self.intersection.discard(key)
+
+    def _reclassify_all(self):
+        # the number of nodes changed, so every key has to be looked at again
+        n = len(self.nodes)
+        self.intersection = {key for key, count in self.counts.items() if count == n}
+        self.relevant = self.counts.keys() - self.intersection
+
+    def identify(self, default=0):
+        return {key: tuple(node.get(key, default) for node in self.nodes.values())
+                for key in self.relevant}
+
+
+tracker = DivergenceTracker()
+tracker.register('n1', n1)
+tracker.register('n2', n2)
+tracker.register('n3', n3)
+print(tracker.identify() == identify(n1, n2, n3))
+
+tracker.update('n2', changed={'employee': 12, 'login': 7})
+tracker.update('n3', changed={'employee': 3, 'user': 90}, removed=['users'])
+print(tracker.union, tracker.intersection, tracker.relevant)
+print(tracker.identify())
+
+print('#' * 52 + '  Lets time a small delta against the fleet from above: ')
+
+tracker = DivergenceTracker()
+for i, node in enumerate(fleet):
+    tracker.register(i, node)
+
+number = 1_000
+elapsed = timeit("tracker.update(7, changed={'key_1': 1, 'key_2': 2, 'key_new': 3}, removed=['key_3'])",
+                 globals=globals(), number=number)
+print(f'{elapsed / number * 1e6:.1f} microseconds per update')
+print(tracker.relevant == identify(*tracker.nodes.values()).keys())
+
+print('#' * 52 + '  So far all the node inventories had to be available locally. For large remote inventories each '
+                 '  node can instead publish a Merkle tree: keys are hashed into buckets, each bucket gets a digest '
+                 '  of its keys, and each parent a digest of its two children. Comparing the trees top-down tells '
+                 '  us which buckets differ, and only those buckets need to be shipped and passed to `identify`: ')
+
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import blake2b
+
+from stable_keys import encode_key
+
+
+def key_digest(key):
+    # hash() and repr() can differ between processes, so digest a canonical encoding of the key instead
+    return blake2b(encode_key(key), digest_size=8).digest()
+
+
+def build_merkle(inventory, depth=8):
+    buckets = [{} for _ in range(2 ** depth)]
+    hashed = [[] for _ in range(2 ** depth)]
+    for key, value in inventory.items():
+        digest = key_digest(key)
+        bucket = int.from_bytes(digest, 'big') >> (64 - depth)
+        buckets[bucket][key] = value
+        hashed[bucket].append(digest)
+    level = [blake2b(b''.join(sorted(digests)), digest_size=16).digest() for digests in hashed]
+    levels = [level]
+    while len(level) > 1:
+        level = [blake2b(level[i] + level[i + 1], digest_size=16).digest()
+                 for i in range(0, len(level), 2)]
+        levels.append(level)
+    levels.reverse()  # levels[0] is the root, levels[depth] the buckets
+    return levels, buckets
+
+
+node_levels, node_buckets = None, None
+
+
+def init_node(inventory, depth):
+    global node_levels, node_buckets
+    node_levels, node_buckets = build_merkle(inventory, depth)
+
+
+def node_digests(level, indices):
+    return [node_levels[level][i] for i in indices]
+
+
+def node_inventory(indices):
+    return {key: value for i in indices for key, value in node_buckets[i].items()}
+
+
+def exchange(executors, func, *args):
+    futures = [executor.submit(func, *args) for executor in executors]
+    replies = [future.result() for future in futures]
+    sent = len(pickle.dumps(args)) * len(executors) + sum(len(pickle.dumps(reply)) for reply in replies)
+    return replies, sent
+
+
+def identify_remote(executors, depth=8, default=0):
+    divergent, sent = [0], 0
+    for level in range(depth + 1):
+        replies, nbytes = exchange(executors, node_digests, level, divergent)
+        sent += nbytes
+        divergent = [i for i, *digests in zip(divergent, *replies) if len(set(digests)) > 1]
+        if level < depth:
+            divergent = [child for i in divergent for child in (2 * i, 2 * i + 1)]
+    partials, nbytes = exchange(executors, node_inventory, divergent)
+    return identify(*partials, default=default), sent + nbytes
+
+
+if __name__ == '__main__':
+    from random import sample
+
+    depth = 14
+    base = {f'key_{k}': k for k in range(200_000)}
+    inventories = []
+    for _ in range(5):
+        inventory = dict(base)
+        for key in sample(list(base), 20):
+            del inventory[key]
+        inventory.update((f'extra_{k}', k) for k in sample(range(1_000), 5))
+        inventories.append(inventory)
+
+    executors = [ProcessPoolExecutor(max_workers=1, initializer=init_node, initargs=(inventory, depth))
+                 for inventory in inventories]
+    try:
+        result, sent = identify_remote(executors, depth)
+    finally:
+        for executor in executors:
+            executor.shutdown()
+    print(result == identify(*inventories))
+    print(f'{len(result)} relevant keys, {sent:,} bytes exchanged, '
+          f'{sum(len(pickle.dumps(inventory)) for inventory in inventories):,} bytes for the full inventories')
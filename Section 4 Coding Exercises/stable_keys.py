@@ -0,0 +1,64 @@
+"""Canonical byte encoding of dictionary keys, shared by the coding exercise solutions.
+
+``hash()`` is randomized per process, and so is anything derived from it - the iteration
+order of a frozenset, and with it its ``repr``. Keys that several processes have to partition,
+filter or digest the same way are therefore encoded with ``encode_key`` instead: equal keys
+(1, 1.0, True and Fraction(2, 2) included) always get the same bytes, and different keys get
+different bytes.
+
+Supported keys are None, str, bytes, numbers, and tuples and frozensets of those. Anything else
+raises TypeError - there is no way to tell from the outside which attributes make up the
+equality of an arbitrary object.
+"""
+import numbers
+
+
+def encode_key(key):
+    key_type = type(key)
+    # the common key types first, this runs once per key
+    if key_type is str:
+        return b's' + key.encode('utf-8', 'surrogatepass')
+    if key_type is int or key_type is bool:
+        return b'i%d' % key
+    if key_type is tuple:
+        return b'(' + b''.join(map(_framed, key))
+    if key_type is frozenset:
+        return b'{' + b''.join(sorted(map(_framed, key)))
+    if key is None:
+        return b'n'
+    if isinstance(key, str):
+        return encode_key(str(key))
+    if isinstance(key, bytes):
+        return b'b' + bytes(key)
+    if isinstance(key, numbers.Number):
+        return _encode_number(key)
+    if isinstance(key, tuple):
+        return encode_key(tuple(key))
+    if isinstance(key, frozenset):
+        return encode_key(frozenset(key))
+    raise TypeError(f'cannot encode {key_type.__name__} keys')
+
+
+def _framed(key):
+    # length-prefixed, so that the items of a tuple or frozenset cannot run into each other
+    encoded = encode_key(key)
+    return b'%d:' % len(encoded) + encoded
+
+
+def _encode_number(number):
+    if not isinstance(number, numbers.Real):
+        if number.imag:
+            return b'c' + _framed(number.real) + _framed(number.imag)
+        number = number.real
+    if isinstance(number, numbers.Integral):
+        return b'i%d' % int(number)
+    try:
+        # exact for float, Fraction and Decimal, so 0.5 == Fraction(1, 2) == Decimal('0.5') agree
+        numerator, denominator = number.as_integer_ratio()
+    except (OverflowError, ValueError):  # inf and nan
+        return b'f' + repr(float(number)).encode()
+    except AttributeError:
+        numerator, denominator = float(number).as_integer_ratio()
+    if denominator == 1:
+        return b'i%d' % numerator
+    return b'q%d/%d' % (numerator, denominator)
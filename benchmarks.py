@@ -0,0 +1,217 @@
+"""Benchmark suite for the timing experiments in the course scripts.
+
+The ad hoc ``print(timeit(...))`` calls in the lectures are collected here as
+parametrized cases, so they can be re-run on any Python version and compared:
+
+    python benchmarks.py                      # run everything, print a table
+    python benchmarks.py --suite dict_copy    # only one suite
+    python benchmarks.py --json results.json  # also write machine-readable results
+
+Each case is timed with warmup runs followed by ``--repeat`` measured runs (each
+of them looping enough times to take a measurable amount of time), and the
+peak memory allocated by one extra run is recorded with ``tracemalloc``.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tracemalloc
+from collections import OrderedDict, deque
+from itertools import product
+from timeit import Timer
+
+SUITES = {}
+
+
+def suite(name, **grid):
+    """Register a case factory, to be called with every combination of the ``grid`` values.
+
+    The factory prepares its data and returns a zero-argument callable - the code being timed.
+    """
+    def decorator(factory):
+        SUITES.setdefault(name, []).append((factory, grid))
+        return factory
+    return decorator
+
+
+def make_keys(size, key_type):
+    return [str(i) for i in range(size)] if key_type == 'str' else list(range(size))
+
+
+def make_value(i, value_type):
+    if value_type == 'str':
+        return str(i)
+    if value_type == 'list':
+        return [i]
+    return i
+
+
+# Section 3, 16. Updating, Merging, and Copying
+copy_methods = {
+    'unpacking': lambda d: {**d},
+    'copy': lambda d: d.copy(),
+    'create': lambda d: dict(d),
+    'comprehension': lambda d: {k: v for k, v in d.items()},
+}
+
+
+@suite('dict_copy', method=list(copy_methods), size=[1_000, 100_000, 1_000_000],
+       key_type=['int', 'str'], value_type=['int', 'str', 'list'])
+def dict_copy(method, size, key_type, value_type):
+    d = {k: make_value(i, value_type) for i, k in enumerate(make_keys(size, key_type))}
+    copy = copy_methods[method]
+    return lambda: copy(d)
+
+
+# Section 5, 30. Common Operations
+@suite('membership', container=['list', 'set', 'dict'], size=[100_000],
+       position=['first', 'last', 'missing'])
+def membership(container, size, position):
+    data = {'list': list, 'set': set, 'dict': dict.fromkeys}[container](range(size))
+    search = {'first': 9, 'last': size - 1, 'missing': -1}[position]
+    return lambda: search in data
+
+
+# Section 3, 68. OrderedDict and 69. OrderedDict and Python 3.6 Dicts
+@suite('ordered_dict', structure=['dict', 'OrderedDict', 'deque'], size=[10_000],
+       operation=['create', 'pop_last', 'pop_first'])
+def ordered_dict(structure, size, operation):
+    if structure == 'deque':
+        def create():
+            return deque(range(size))
+
+        def pop_all(last):
+            q = create()
+            pop = q.pop if last else q.popleft
+            for _ in range(size):
+                pop()
+    else:
+        cls = dict if structure == 'dict' else OrderedDict
+
+        def create():
+            return cls.fromkeys(range(size))
+
+        def pop_all(last):
+            d = create()
+            if cls is OrderedDict:
+                for _ in range(size):
+                    d.popitem(last=last)
+            elif last:
+                for _ in range(size):
+                    d.popitem()
+            else:
+                for _ in range(size):
+                    del d[next(iter(d))]
+
+    if operation == 'create':
+        return create
+    return lambda: pop_all(operation == 'pop_last')
+
+
+# Section 3, 69. OrderedDict and Python 3.6 Dicts
+@suite('ordered_dict', structure=['dict', 'OrderedDict'], size=[10_000], operation=['lookup'])
+def ordered_dict_lookup(structure, size, operation):
+    d = (dict if structure == 'dict' else OrderedDict).fromkeys(range(size))
+    key = size - 1
+    return lambda: d[key]
+
+
+# Section 3, 18. Custom Classes and Hashing
+class Number:
+    def __init__(self, x):
+        self.x = x
+
+    def __eq__(self, other):
+        return isinstance(other, Number) and self.x == other.x
+
+    def __hash__(self):
+        return hash(self.x)
+
+
+class SameHash(Number):
+    def __hash__(self):
+        return 100
+
+
+@suite('hashing', key_class=['Number', 'SameHash'], size=[1_000])
+def hashing(key_class, size):
+    cls = Number if key_class == 'Number' else SameHash
+    d = {cls(i): 'some value' for i in range(size)}
+    key = cls(size // 2)
+    return lambda: d[key]
+
+
+def measure(func, repeat=7, warmup=2):
+    if repeat < 1:
+        raise ValueError(f'repeat must be at least 1, got {repeat}')
+    timer = Timer(func)
+    number, _ = timer.autorange()
+    for _ in range(warmup):
+        timer.timeit(number)
+    times = sorted(timer.timeit(number) / number for _ in range(repeat))
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'loops': number,
+        'min': times[0],
+        'median': statistics.median(times),
+        'p95': statistics.quantiles(times, n=20, method='inclusive')[-1] if len(times) > 1 else times[0],
+        'peak_memory': peak,
+    }
+
+
+def run(suites=None, repeat=7, warmup=2, max_size=None):
+    for name, cases in SUITES.items():
+        if suites and name not in suites:
+            continue
+        for factory, grid in cases:
+            for values in product(*grid.values()):
+                params = dict(zip(grid, values))
+                if max_size is not None and params.get('size', 0) > max_size:
+                    continue
+                stats = measure(factory(**params), repeat=repeat, warmup=warmup)
+                yield {'suite': name, 'case': factory.__name__, 'params': params, **stats}
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+    }
+
+
+def positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1, got {value}')
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--suite', action='append', choices=sorted(SUITES),
+                        help='only run this suite (may be given more than once)')
+    parser.add_argument('--repeat', type=positive_int, default=7)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--max-size', type=int, help='skip cases whose size parameter is larger')
+    parser.add_argument('--json', metavar='PATH', help='write the results to PATH as JSON')
+    args = parser.parse_args(argv)
+
+    results = []
+    for result in run(args.suite, args.repeat, args.warmup, args.max_size):
+        params = ', '.join(f'{k}={v}' for k, v in result['params'].items())
+        print(f"{result['suite']:<14} {params:<60} median {result['median'] * 1e6:12.3f} us"
+              f"   p95 {result['p95'] * 1e6:12.3f} us   peak {result['peak_memory']:>12,} B")
+        results.append(result)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    sys.exit(main())